@@ -0,0 +1,301 @@
+import re
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Catalog columns searchable by free text
+SEARCH_FIELDS = ['brand', 'model', 'type', 'color', 'fuel']
+
+# Words that carry no search meaning in queries like "a used RAV4 or CR-V"
+STOPWORDS = {
+    'a', 'an', 'and', 'or', 'the', 'with', 'for', 'in', 'of', 'to', 'is', 'i', 'me', 'my',
+    'want', 'need', 'looking', 'find', 'show', 'used', 'car', 'cars', 'vehicle', 'cheap',
+    'good', 'nice', 'around', 'about', 'than', 'under', 'below', 'over', 'above', 'from',
+    'please',
+}
+
+MIN_SIMILARITY = 0.45
+
+_NUMBER = r'\$?\s*(\d+(?:[.,]\d+)*)\s*(k\b)?'
+_MILES = r'\s*(?:miles?|mi\b|mileage)'
+# The leading guard keeps comparators from matching inside words ("rover")
+_MAX_WORDS = r'(?<![a-z])(?:under|below|less than|max|maximum|up to|at most|cheaper than|<)'
+_MIN_WORDS = r'(?<![a-z])(?:over|above|more than|at least|min|minimum|>)'
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip punctuation so "CR-V" and "crv" compare equal"""
+    return re.sub(r'[^a-z0-9]', '', str(text).lower())
+
+
+def ngrams(term: str, n: int = 3) -> set:
+    """Character n-grams of a term padded with boundary markers"""
+    padded = f"${term}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _parse_number(digits: str, thousands: str) -> float:
+    """Turn "18", "k" into 18000 and "$20,000" into 20000"""
+    value = float(digits.replace(',', ''))
+    return value * 1000 if thousands else value
+
+
+def parse_constraints(query: str) -> Tuple[Dict[str, List[float]], str]:
+    """
+    Extract numeric price / mileage / year constraints from a free-text query.
+    Returns the constraints as {column: [min, max]} and the remaining text.
+    """
+    text = query.lower()
+    constraints = {}
+
+    def bound(column, low=None, high=None):
+        current = constraints.setdefault(column, [None, None])
+        if low is not None:
+            current[0] = low
+        if high is not None:
+            current[1] = high
+
+    def consume(pattern, handler):
+        nonlocal text
+        for match in re.finditer(pattern, text):
+            handler(match)
+        text = re.sub(pattern, ' ', text)
+
+    # Ranges first so their numbers aren't re-read as single bounds
+    consume(rf'\bbetween\s+{_NUMBER}\s+and\s+{_NUMBER}({_MILES})?', lambda m: bound(
+        'mileage' if m.group(5) else 'price',
+        _parse_number(m.group(1), m.group(2)), _parse_number(m.group(3), m.group(4))))
+
+    # Model years: "2015-2018", "after 2015", "2018 or newer", "before 2020", "2017"
+    consume(r'\b((?:19|20)\d{2})\s*(?:-|–|to)\s*((?:19|20)\d{2})\b',
+            lambda m: bound('year', low=int(m.group(1)), high=int(m.group(2))))
+    consume(r'\b(?:after|since|newer than|from)\s+((?:19|20)\d{2})\b',
+            lambda m: bound('year', low=int(m.group(1))))
+    consume(r'\b(?:before|older than)\s+((?:19|20)\d{2})\b',
+            lambda m: bound('year', high=int(m.group(1))))
+    consume(r'\b((?:19|20)\d{2})\s*(?:\+|or newer|and newer|and up)',
+            lambda m: bound('year', low=int(m.group(1))))
+
+    # A comparator before a bare model year bounds the year, not the price:
+    # "RAV4 over 2015" means newer than 2015, not more than $2,015
+    consume(rf'{_MIN_WORDS}\s*((?:19|20)\d{{2}})\b(?!\s*(?:k\b|miles?|mi\b))',
+            lambda m: bound('year', low=int(m.group(1))))
+    consume(rf'{_MAX_WORDS}\s*((?:19|20)\d{{2}})\b(?!\s*(?:k\b|miles?|mi\b))',
+            lambda m: bound('year', high=int(m.group(1))))
+
+    consume(rf'{_MAX_WORDS}\s*{_NUMBER}{_MILES}', lambda m: bound(
+        'mileage', high=_parse_number(m.group(1), m.group(2))))
+    consume(rf'{_MIN_WORDS}\s*{_NUMBER}{_MILES}', lambda m: bound(
+        'mileage', low=_parse_number(m.group(1), m.group(2))))
+    consume(rf'{_MAX_WORDS}\s*{_NUMBER}', lambda m: bound(
+        'price', high=_parse_number(m.group(1), m.group(2))))
+    consume(rf'{_MIN_WORDS}\s*{_NUMBER}', lambda m: bound(
+        'price', low=_parse_number(m.group(1), m.group(2))))
+
+    # Bare amounts without a comparator read as upper limits: "100k miles",
+    # "$18,000", "18k"
+    consume(rf'(?<![\w.]){_NUMBER}{_MILES}', lambda m: bound(
+        'mileage', high=_parse_number(m.group(1), m.group(2))))
+    consume(r'\$\s*(\d+(?:[.,]\d+)*)\s*(k\b)?', lambda m: bound(
+        'price', high=_parse_number(m.group(1), m.group(2))))
+    consume(r'\b(\d+(?:\.\d+)?)\s*(k)\b', lambda m: bound(
+        'price', high=_parse_number(m.group(1), m.group(2))))
+
+    # A bare model year ("2018 camry") pins the year; other numbers stay as
+    # text so models like "1500" or "Model 3" remain searchable
+    consume(r'(?<!\$)\b((?:19|20)\d{2})\b(?!\s*(?:k\b|miles?|mi\b))',
+            lambda m: bound('year', low=int(m.group(1)), high=int(m.group(1))))
+
+    return constraints, text
+
+
+class CarSearchIndex:
+    """
+    Precomputed character n-gram index over the catalog's text fields.
+    Every value of every search field is split into word spans ("CR-V Hybrid"
+    -> "crv", "hybrid", "crvhybrid"), and each span's n-grams are posted in an
+    inverted index so typo-tolerant lookups only touch candidate terms.
+    """
+
+    def __init__(self, cars_df: pd.DataFrame, fields: List[str] = None, n: int = 3):
+        """Build the index once per catalog"""
+        self.cars_df = cars_df
+        self.fields = fields or SEARCH_FIELDS
+        self.n = n
+
+        # Per field: integer code for each row and the distinct values
+        self.codes = {}
+        self.values = {}
+        for field in self.fields:
+            codes, uniques = pd.factorize(cars_df[field])
+            self.codes[field] = codes
+            self.values[field] = list(uniques)
+
+        # term -> {(field, value code)}, and n-gram -> term ids
+        self.terms = []
+        self.term_targets = []
+        self.term_sizes = []
+        self.gram_index = defaultdict(list)
+        term_ids = {}
+        for field in self.fields:
+            for code, value in enumerate(self.values[field]):
+                for term in self._value_terms(value):
+                    if term not in term_ids:
+                        term_ids[term] = len(self.terms)
+                        self.terms.append(term)
+                        self.term_targets.append(set())
+                        grams = ngrams(term, n)
+                        self.term_sizes.append(len(grams))
+                        for gram in grams:
+                            self.gram_index[gram].append(term_ids[term])
+                    self.term_targets[term_ids[term]].add((field, code))
+        self.term_sizes = np.array(self.term_sizes)
+
+    @staticmethod
+    def _value_terms(value: str) -> set:
+        """All contiguous word spans of a catalog value, normalized"""
+        words = [normalize(w) for w in str(value).split()]
+        words = [w for w in words if w]
+        return {''.join(words[i:j]) for i in range(len(words)) for j in range(i + 1, len(words) + 1)}
+
+    def match_term(self, token: str) -> Dict[Tuple[str, int], float]:
+        """Fuzzy-match one query token; returns {(field, value code): similarity}"""
+        if len(token) <= 2:
+            # Too short for n-gram similarity to mean anything: exact only
+            term_ids = [i for i, term in enumerate(self.terms) if term == token]
+            similarities = np.ones(len(term_ids))
+        else:
+            grams = ngrams(token, self.n)
+            shared = np.zeros(len(self.terms))
+            for gram in grams:
+                for term_id in self.gram_index.get(gram, ()):
+                    shared[term_id] += 1
+            # Dice coefficient over n-gram sets
+            dice = 2 * shared / (len(grams) + self.term_sizes)
+            # An exact hit beats typo tolerance: "model3" shouldn't also pull in "models"
+            threshold = 1.0 if dice.max(initial=0) >= 1.0 else MIN_SIMILARITY
+            term_ids = np.nonzero(dice >= threshold)[0]
+            similarities = dice[term_ids]
+
+        matches = {}
+        for term_id, similarity in zip(term_ids, similarities):
+            for target in self.term_targets[term_id]:
+                matches[target] = max(matches.get(target, 0), float(similarity))
+        return matches
+
+    def _clauses(self, text: str) -> Tuple[List[Tuple[str, Dict[Tuple[str, int], float]]], List[str]]:
+        """
+        Split remaining query text into matched clauses. Adjacent tokens are
+        joined when that matches better ("rav 4" -> "rav4", "cr v" -> "crv").
+        Returns the clauses and the tokens that matched nothing.
+        """
+        tokens = [t for t in re.findall(r'[a-z0-9]+', text.lower()) if t not in STOPWORDS]
+        clauses = []
+        unmatched = []
+        i = 0
+        while i < len(tokens):
+            single = self.match_term(tokens[i])
+            if i + 1 < len(tokens):
+                joined_token = tokens[i] + tokens[i + 1]
+                joined = self.match_term(joined_token)
+                next_single = self.match_term(tokens[i + 1])
+                if joined and max(joined.values()) >= max(
+                        list(single.values()) + list(next_single.values()) + [0]):
+                    clauses.append((joined_token, joined))
+                    i += 2
+                    continue
+            if single:
+                clauses.append((tokens[i], single))
+            else:
+                unmatched.append(tokens[i])
+            i += 1
+        return clauses, unmatched
+
+    def search(self, query: str, limit: int = 15) -> Tuple[pd.DataFrame, Dict[str, List[float]], List[str], List[str]]:
+        """
+        Search the whole catalog. Clauses hitting the same field are OR'ed
+        ("RAV4 or CR-V"), different fields are AND'ed ("red SUV").
+        Returns matching rows with a search_score column, the parsed numeric
+        constraints, the matched clause tokens and the unmatched tokens.
+        The AND is never relaxed: a query with a word that matches nothing, or
+        whose fields match no listing together ("toyota civic"), returns no
+        rows.
+        """
+        constraints, text = parse_constraints(query)
+        row_count = len(self.cars_df)
+
+        mask = np.ones(row_count, dtype=bool)
+        for column, (low, high) in constraints.items():
+            values = self.cars_df[column].to_numpy()
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+
+        clauses, unmatched = self._clauses(text)
+        scores = np.zeros(row_count)
+        if unmatched:
+            mask[:] = False
+        elif clauses:
+            group_hits = defaultdict(lambda: np.zeros(row_count, dtype=bool))
+            for _, matches in clauses:
+                clause_scores = np.zeros(row_count)
+                for field in self.fields:
+                    field_sims = np.zeros(len(self.values[field]))
+                    for (match_field, code), similarity in matches.items():
+                        if match_field == field:
+                            field_sims[code] = similarity
+                    clause_scores = np.maximum(clause_scores, field_sims[self.codes[field]])
+                best = max(matches.values())
+                best_field = min((field for (field, _), similarity in matches.items() if similarity == best),
+                                 key=self.fields.index)
+                group_hits[best_field] |= clause_scores > 0
+                scores += clause_scores
+
+            mask &= np.logical_and.reduce(list(group_hits.values()))
+
+        results = self.cars_df[mask].copy()
+        results['search_score'] = scores[mask] / max(len(clauses), 1)
+        sort_columns = ['search_score'] + (['pricing_score'] if 'pricing_score' in results.columns else [])
+        results = results.sort_values(sort_columns + ['price'],
+                                      ascending=[False] * len(sort_columns) + [True], kind='stable')
+        return results.head(limit), constraints, [token for token, _ in clauses], unmatched
+
+
+def describe_constraints(constraints: Dict[str, List[float]]) -> List[str]:
+    """Human-readable summary of parsed numeric constraints"""
+    formats = {'price': '${:,.0f}', 'mileage': '{:,.0f} miles', 'year': '{:.0f}'}
+    parts = []
+    for column, (low, high) in constraints.items():
+        fmt = formats[column]
+        if low is not None and low == high:
+            parts.append(f"{column} {fmt.format(low)}")
+        elif low is not None and high is not None:
+            parts.append(f"{column} {fmt.format(low)}-{fmt.format(high)}")
+        elif high is not None:
+            parts.append(f"{column} up to {fmt.format(high)}")
+        elif low is not None:
+            parts.append(f"{column} from {fmt.format(low)}")
+    return parts
+
+
+def get_search_recommendations(index: CarSearchIndex, query: str, limit: int = 15) -> Tuple[pd.DataFrame, str]:
+    """
+    Run a free-text search and shape results for show_results rendering
+    (ai_score / ai_explanation columns), without any API calls
+    """
+    results, constraints, tokens, unmatched = index.search(query, limit)
+    criteria = [f'"{token}"' for token in tokens] + describe_constraints(constraints)
+    if unmatched:
+        summary = "No listings match " + ", ".join(f'"{token}"' for token in unmatched)
+    elif results.empty:
+        summary = "No listings match " + " and ".join(criteria) + (" together" if len(criteria) > 1 else "")
+    else:
+        summary = "Matches " + ", ".join(criteria) if criteria else "All listings"
+
+    results['ai_score'] = (60 + 40 * results['search_score']).round() if tokens else 75
+    results['ai_explanation'] = summary
+    return results.drop(columns='search_score'), summary
@@ -3,6 +3,7 @@ import streamlit as st
 import pandas as pd
 import json
 from typing import Dict, List, Tuple
+from pricing_model import add_pricing_scores
 
 class CarRecommenderAI:
     def __init__(self, api_key: str):
@@ -16,6 +17,10 @@ class CarRecommenderAI:
         Returns: DataFrame with AI scores and explanations
         """
         
+        # Pricing is scored locally against the market model, not by the LLM
+        if 'pricing_score' not in cars_data.columns:
+            cars_data = add_pricing_scores(cars_data)
+        
         # Filter by budget first to reduce processing
         budget_filtered = cars_data[cars_data['price'] <= user_responses['budget'] * 1.2]
         
@@ -63,8 +68,8 @@ CARS:
 {cars_summary}
 
 Respond with ONLY this format (no explanations):
-1: match=85, price=75, reason="Great family car, good value"  
-2: match=70, price=90, reason="Reliable but pricey"
+1: match=85, reason="Great family car"
+2: match=70, reason="Reliable but small"
 [etc for each car]"""
 
         try:
@@ -72,14 +77,15 @@ Respond with ONLY this format (no explanations):
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": system_prompt}],
                 temperature=0.1,  # Lower temperature for more consistent scoring
-                max_tokens=800   # Limit tokens for faster response
+                max_tokens=500   # Limit tokens for faster response
             )
             
             # Parse the response quickly
             content = response.choices[0].message.content.strip()
             
-            # Parse scores from the response
+            # Parse scores from the response (keeping catalog row IDs as the index)
             scored_cars = []
+            row_ids = []
             lines = content.split('\n')
             
             for i, line in enumerate(lines):
@@ -87,30 +93,29 @@ Respond with ONLY this format (no explanations):
                     break
                     
                 try:
-                    # Extract match and price scores from format: "1: match=85, price=75, reason="text""
-                    if 'match=' in line and 'price=' in line:
+                    # Extract match score from format: "1: match=85, reason="text""
+                    # (pricing_score already comes from the local market price model)
+                    if 'match=' in line:
                         match_part = line.split('match=')[1].split(',')[0].strip()
-                        price_part = line.split('price=')[1].split(',')[0].strip()
                         reason_part = line.split('reason="')[1].split('"')[0] if 'reason="' in line else "Good option"
                         
                         match_score = min(100, max(0, int(match_part)))
-                        price_score = min(100, max(0, int(price_part)))
                         
                         car_dict = cars_df.iloc[i].to_dict()
                         car_dict['ai_score'] = match_score
-                        car_dict['pricing_score'] = price_score
                         car_dict['ai_explanation'] = reason_part
                         scored_cars.append(car_dict)
+                        row_ids.append(cars_df.index[i])
                         
                 except (ValueError, IndexError):
                     # Fallback scoring if parsing fails
                     car_dict = cars_df.iloc[i].to_dict()
                     car_dict['ai_score'] = 75  # Default decent score
-                    car_dict['pricing_score'] = 75
                     car_dict['ai_explanation'] = "Good option for your needs"
                     scored_cars.append(car_dict)
+                    row_ids.append(cars_df.index[i])
             
-            return pd.DataFrame(scored_cars)
+            return pd.DataFrame(scored_cars, index=row_ids)
             
         except Exception as e:
             # Fallback: simple rule-based scoring if AI fails
@@ -120,8 +125,9 @@ Respond with ONLY this format (no explanations):
     def fallback_scoring(self, cars_df: pd.DataFrame, user_responses: Dict) -> pd.DataFrame:
         """Fast rule-based scoring when AI is unavailable"""
         scored_cars = []
+        row_ids = []
         
-        for _, car in cars_df.iterrows():
+        for row_id, car in cars_df.iterrows():
             # Simple scoring based on budget, mileage, and safety
             budget_score = 100 - abs(car['price'] - user_responses['budget']) / user_responses['budget'] * 100
             mileage_score = max(0, 100 - car.get('mileage', 100000) / 2000)  # Lower mileage = better score
@@ -132,11 +138,11 @@ Respond with ONLY this format (no explanations):
             
             car_dict = car.to_dict()
             car_dict['ai_score'] = int(match_score)
-            car_dict['pricing_score'] = 75  # Default pricing score
             car_dict['ai_explanation'] = "Quick analysis match"
             scored_cars.append(car_dict)
+            row_ids.append(row_id)
             
-        return pd.DataFrame(scored_cars)
+        return pd.DataFrame(scored_cars, index=row_ids)
     
     def generate_unified_summary(self, recommendations: pd.DataFrame, user_responses: Dict) -> str:
         """Generate a unified summary for the single AI recommendation system"""
@@ -0,0 +1,475 @@
+"""
+Concurrent-session load test for one Streamlit server running main.py.
+
+Starts a single `streamlit run main.py` process pointed at a local fake OpenAI
+server, then opens many websocket sessions against it, the same way browsers
+do, and drives each one through the real user flow (questionnaire submit ->
+results -> card buttons -> consultant chat turns). All sessions therefore
+contend inside one server process: for the GIL, the shared st.cache_data /
+st.cache_resource entries, the session memory manager and the script threads
+blocked on OpenAI calls.
+
+While a level runs, the server process's own CPU time and RSS are sampled from
+/proc, so the report shows how much one server holds and where its latency
+starts to climb. Sessions stay connected until every session of their level
+has finished, so RSS is read with all of them open.
+
+Usage:
+    pip install -r requirements-dev.txt
+    python load_test.py --concurrency 1,5,10,25 --chat-turns 3
+    python load_test.py --concurrency 10 --openai-latency 0.8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import numpy as np
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHAT_QUESTIONS = [
+    "How much should I budget for insurance on a used SUV?",
+    "What should I check during a test drive?",
+    "Is it better to finance through the dealer or my bank?",
+    "How often does a hybrid battery need replacing?",
+]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions endpoint mimicking the OpenAI API"""
+
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        if request.get("stream"):
+            self._send_stream("Great question! 🚗 Here is some general advice for you. " * 4)
+        elif "match=" in prompt:
+            # Scoring prompt: answer one line per numbered car listing
+            car_count = len(re.findall(r"^\d+\. ", prompt, flags=re.MULTILINE))
+            lines = [f'{i + 1}: match={90 - i}, reason="Solid fit"' for i in range(car_count)]
+            self._send_completion("\n".join(lines))
+        else:
+            self._send_completion("Welcome! Here is your personalized summary. " * 10)
+
+    def _send_completion(self, content: str):
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for word in content.split(" "):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        """Silence per-request logging"""
+
+
+def start_fake_openai(latency: float) -> ThreadingHTTPServer:
+    """Serve the fake OpenAI API from a background thread of the load generator"""
+    FakeOpenAIHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app_server(openai_port: int, log_file):
+    """Start one `streamlit run main.py` process and wait until it is healthy"""
+    port = free_port()
+    env = dict(os.environ,
+               OPENAI_API_KEY="sk-load-test",
+               OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "main.py",
+         "--server.headless", "true",
+         "--server.address", "127.0.0.1",
+         "--server.port", str(port),
+         "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {process.returncode}; see {log_file.name}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return process, f"ws://127.0.0.1:{port}/_stcore/stream"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"streamlit did not become healthy; see {log_file.name}")
+
+
+class ServerMonitor(threading.Thread):
+    """
+    Samples the app server's CPU time and RSS from /proc (Linux) together with
+    the number of websocket sessions the load generator has open
+    """
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.open_sessions = 0
+        self.sessions_served = 0
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def read(self) -> Dict:
+        """One sample: server CPU seconds used so far, RSS in MB and session counts"""
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            with open(f"/proc/{self.pid}/status") as f:
+                rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:")) / 1024
+        except (OSError, StopIteration, IndexError, ValueError):
+            cpu = rss = float("nan")
+        return {"time": time.perf_counter(), "cpu_seconds": cpu, "rss_mb": rss,
+                "open_sessions": self.open_sessions, "sessions_served": self.sessions_served}
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.samples.append(self.read())
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _new_page() -> Dict:
+    return {"buttons": [], "chat_input": None, "errors": []}
+
+
+async def rerun(ws, widgets: List[WidgetState] = ()) -> Dict:
+    """
+    Send one rerun with the given widget states, as a browser does on each
+    interaction, and collect the buttons, chat input and errors of the page it
+    produces. Reruns the app triggers itself (st.rerun) are followed to the
+    final page.
+    """
+    message = BackMsg()
+    message.rerun_script.query_string = ""
+    message.rerun_script.widget_states.widgets.extend(widgets)
+    await ws.send(message.SerializeToString())
+
+    page = _new_page()
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await ws.recv())
+        kind = forward.WhichOneof("type")
+
+        if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+            element = forward.delta.new_element
+            element_type = element.WhichOneof("type")
+            if element_type == "button":
+                page["buttons"].append((element.button.label, element.button.id))
+            elif element_type == "chat_input":
+                page["chat_input"] = element.chat_input.id
+            elif element_type == "exception":
+                page["errors"].append(f"{element.exception.type}: {element.exception.message}")
+            elif element_type == "alert" and element.alert.format == Alert.ERROR:
+                page["errors"].append(element.alert.body)
+
+        elif kind == "script_finished":
+            if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                page = _new_page()
+            elif forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                page["errors"].append("main.py failed to compile")
+                return page
+            else:
+                return page
+
+
+def click(page: Dict, label: str, occurrence: int = 0) -> List[WidgetState]:
+    """Widget states for clicking the n-th button whose label contains `label`"""
+    ids = [widget_id for button_label, widget_id in page["buttons"] if label in button_label]
+    if len(ids) <= occurrence:
+        raise LookupError(f"no button {label!r} on the page")
+    return [WidgetState(id=ids[occurrence], trigger_value=True)]
+
+
+def chat(page: Dict, text: str) -> List[WidgetState]:
+    """Widget states for submitting a consultant chat message"""
+    if page["chat_input"] is None:
+        raise LookupError("no chat input on the page")
+    state = WidgetState(id=page["chat_input"])
+    state.chat_input_value.data = text
+    return [state]
+
+
+async def run_session(url: str, monitor: ServerMonitor, chat_turns: int, timeout: float,
+                      finished: asyncio.Queue, release: asyncio.Event):
+    """
+    Drive one websocket session through the full flow, timing each
+    interaction, then stay connected until the level releases it. Failures
+    are reported, not raised, so timings recorded before them are kept.
+    """
+    timings = defaultdict(list)
+    errors = []
+    connected = False
+    try:
+        async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+            connected = True
+            monitor.open_sessions += 1
+            monitor.sessions_served += 1
+
+            async def timed(name, widgets=()):
+                start = time.perf_counter()
+                page = await asyncio.wait_for(rerun(ws, widgets), timeout)
+                timings[name].append(time.perf_counter() - start)
+                errors.extend(f"{name}: {error}" for error in page["errors"])
+                return page
+
+            try:
+                page = await timed("load_questionnaire")
+                page = await timed("submit_and_results", click(page, "Find My Perfect"))
+                for label, occurrence in [("Carfax Report", 0), ("Book Inspection", 1)]:
+                    page = await timed("card_button", click(page, label, occurrence))
+                for turn in range(chat_turns):
+                    question = CHAT_QUESTIONS[turn % len(CHAT_QUESTIONS)]
+                    page = await timed("chat_turn", chat(page, question))
+            except Exception:
+                errors.append(traceback.format_exc())
+
+            await finished.put({"timings": dict(timings), "errors": errors})
+            await release.wait()
+    except Exception:
+        # Only a failed connect is still unreported here
+        if not connected:
+            errors.append(traceback.format_exc())
+            await finished.put({"timings": dict(timings), "errors": errors})
+    finally:
+        if connected:
+            monitor.open_sessions -= 1
+
+
+async def run_level(url: str, monitor: ServerMonitor, concurrency: int,
+                    chat_turns: int, timeout: float) -> Dict:
+    """Open `concurrency` sessions at once against the one server and measure it"""
+    before = monitor.read()
+    finished = asyncio.Queue()
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(run_session(url, monitor, chat_turns, timeout, finished, release))
+             for _ in range(concurrency)]
+
+    results = [await finished.get() for _ in range(concurrency)]
+    # Every session of the level is still connected here
+    held = monitor.read()
+    wall = held["time"] - before["time"]
+    level_samples = [s for s in monitor.samples if s["time"] >= before["time"]] + [held]
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    failed = [r for r in results if r["errors"]]
+    for result in failed:
+        for error in result["errors"]:
+            print(f"session error:\n{error}", file=sys.stderr)
+
+    timings = defaultdict(list)
+    for result in results:
+        for name, values in result["timings"].items():
+            timings[name].extend(values)
+
+    cpu_used = held["cpu_seconds"] - before["cpu_seconds"]
+    peak_cores = 0.0
+    for previous, sample in zip([before] + level_samples, level_samples):
+        if sample["time"] > previous["time"]:
+            peak_cores = max(peak_cores, (sample["cpu_seconds"] - previous["cpu_seconds"])
+                             / (sample["time"] - previous["time"]))
+
+    interactions = sum(len(values) for values in timings.values())
+    return {
+        "concurrency": concurrency,
+        "failed_sessions": len(failed),
+        "wall_seconds": wall,
+        "sessions_per_second": (concurrency - len(failed)) / wall,
+        "interactions_per_second": interactions / wall,
+        "server_cpu_seconds_per_session": cpu_used / concurrency,
+        "server_cpu_cores_mean": cpu_used / wall,
+        "server_cpu_cores_peak": peak_cores,
+        "server_rss_before_mb": before["rss_mb"],
+        "server_rss_open_mb": held["rss_mb"],
+        "server_rss_peak_mb": max(s["rss_mb"] for s in level_samples),
+        "open_sessions": held["open_sessions"],
+        "sessions_served": held["sessions_served"],
+        "errors": [e for r in failed for e in r["errors"]],
+        "latency_ms": {
+            name: {
+                "count": len(values),
+                "p50": np.percentile(values, 50) * 1000,
+                "p95": np.percentile(values, 95) * 1000,
+                "p99": np.percentile(values, 99) * 1000,
+            }
+            for name, values in timings.items()
+        },
+    }
+
+
+def print_report(report: Dict):
+    """Print one concurrency level's results as a readable table"""
+    print(f"\n=== {report['concurrency']} simultaneous sessions on one server "
+          f"(failed={report['failed_sessions']}) ===")
+    print(f"wall: {report['wall_seconds']:.1f}s | "
+          f"throughput: {report['sessions_per_second']:.2f} sessions/s, "
+          f"{report['interactions_per_second']:.2f} interactions/s")
+    print(f"server cpu: {report['server_cpu_seconds_per_session'] * 1000:.0f} ms/session, "
+          f"{report['server_cpu_cores_mean']:.2f} cores mean, {report['server_cpu_cores_peak']:.2f} peak")
+    print(f"server rss: {report['server_rss_before_mb']:.0f} MB before -> "
+          f"{report['server_rss_open_mb']:.0f} MB with {report['open_sessions']} open "
+          f"({report['sessions_served']} served so far), peak {report['server_rss_peak_mb']:.0f} MB")
+    print(f"{'interaction':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["latency_ms"].items():
+        print(f"{name:<22}{stats['count']:>7}{stats['p50']:>10.0f}{stats['p95']:>10.0f}{stats['p99']:>10.0f}")
+    if report["server_cpu_cores_mean"] >= 0.9:
+        print("NOTE: the server was CPU-bound on one core (script threads share the GIL); "
+              "latency beyond this level grows with queueing, not with work")
+    if report["failed_sessions"]:
+        print(f"WARNING: {report['failed_sessions']} of {report['concurrency']} sessions failed "
+              f"(tracebacks on stderr); latencies include their completed interactions only")
+
+
+def sizing_summary(reports: List[Dict], warm_up: Dict) -> Dict:
+    """
+    Server RSS against sessions served, starting from the warmed-up server.
+    Streamlit keeps a disconnected session's state for a while and the session
+    memory manager keeps it until its idle spill, so every session served so
+    far still counts towards RSS.
+    """
+    points = [warm_up] + reports
+    served = np.array([r["sessions_served"] for r in points], dtype=float)
+    rss = np.array([r["server_rss_open_mb"] for r in points])
+    slope, intercept = np.polyfit(served, rss, 1)
+    return {
+        "warm_rss_mb": warm_up["server_rss_open_mb"],
+        "rss_mb_per_session": float(slope),
+        "rss_intercept_mb": float(intercept),
+        "points": [{"sessions_served": int(s), "rss_mb": float(m)} for s, m in zip(served, rss)],
+    }
+
+
+def print_sizing(sizing: Dict):
+    """Print RSS per sessions served and the linear fit used for sizing"""
+    print("\n=== server RSS vs sessions (first row: after warm-up) ===")
+    print(f"{'sessions served':>16}{'rss MB':>10}")
+    for point in sizing["points"]:
+        print(f"{point['sessions_served']:>16}{point['rss_mb']:>10.0f}")
+    per_session = sizing["rss_mb_per_session"]
+    print(f"fit: {sizing['rss_intercept_mb']:.0f} MB + {per_session:.2f} MB per session")
+    if per_session > 0:
+        print(f"-> about {1024 / per_session:.0f} sessions per additional GB of server memory")
+
+
+async def run_levels(url: str, monitor: ServerMonitor, levels: List[int],
+                     chat_turns: int, timeout: float):
+    """
+    Warm the server up with one unreported session, so imports, st.cache_data
+    and the search index are paid before measuring, then step through levels
+    """
+    warm_up = await run_level(url, monitor, 1, 0, timeout)
+    if warm_up["failed_sessions"]:
+        raise RuntimeError("warm-up session failed; see the tracebacks above")
+    reports = []
+    for concurrency in levels:
+        report = await run_level(url, monitor, concurrency, chat_turns, timeout)
+        print_report(report)
+        reports.append(report)
+    return warm_up, reports
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Load test one main.py server with many concurrent sessions")
+    parser.add_argument("--concurrency", default="1,5,10",
+                        help="Comma-separated simultaneous session counts to step through")
+    parser.add_argument("--chat-turns", type=int, default=2, help="Consultant chat turns per session")
+    parser.add_argument("--openai-latency", type=float, default=0.2,
+                        help="Seconds the fake OpenAI server waits before answering")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-interaction timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    openai_server = start_fake_openai(args.openai_latency)
+    log_file = tempfile.NamedTemporaryFile("w", prefix="load_test_streamlit_", suffix=".log", delete=False)
+    process, url = start_app_server(openai_server.server_address[1], log_file)
+    monitor = ServerMonitor(process.pid)
+    monitor.start()
+    reports = []
+    try:
+        levels = [int(c) for c in args.concurrency.split(",")]
+        warm_up, reports = asyncio.run(run_levels(url, monitor, levels, args.chat_turns, args.timeout))
+        sizing = sizing_summary(reports, warm_up)
+        print_sizing(sizing)
+    finally:
+        monitor.stop()
+        process.terminate()
+        process.wait(timeout=30)
+        openai_server.shutdown()
+        log_file.close()
+
+    if any(r["failed_sessions"] for r in reports):
+        print(f"server log: {log_file.name}", file=sys.stderr)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"levels": reports, "sizing": sizing}, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,11 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+import json
+import uuid
+from pricing_model import add_pricing_scores
+from car_search import CarSearchIndex, get_search_recommendations
+from session_memory import get_session_memory
 
 # Try to import AI components with error handling
 try:
@@ -23,14 +28,25 @@ st.set_page_config(
 # Load the dataset
 @st.cache_data
 def load_data():
-    """Load the car dataset"""
+    """Load the car dataset with market-based pricing scores"""
     try:
         df = pd.read_csv('cars_dataset.csv')
-        return df
+        return add_pricing_scores(df)
     except FileNotFoundError:
         st.error("Dataset file 'cars_dataset.csv' not found. Please make sure it's in the same directory as this script.")
         return None
 
+@st.cache_resource
+def load_search_index(_df):
+    """Build the free-text search index once and share it across sessions"""
+    return CarSearchIndex(_df)
+
+def get_session_id():
+    """Stable ID for this browser session, used as the key into shared session memory"""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
 def setup_ai_assistant():
     """Create a fresh AI assistant for each search - no memory retention"""
     # Check for API key in environment
@@ -50,6 +66,25 @@ def show_questionnaire():
     Our AI analyzes hundreds of used car listings and matches them to your specific needs and preferences.
     """)
     
+    # Free-text search straight into the catalog (no AI call needed)
+    with st.form("car_search"):
+        search_col, button_col = st.columns([4, 1])
+        with search_col:
+            search_query = st.text_input(
+                "Already know what you want?",
+                placeholder='e.g. "a used RAV4 or CR-V under 18k"'
+            )
+        with button_col:
+            st.markdown("<br>", unsafe_allow_html=True)
+            searched = st.form_submit_button("🔎 Search")
+        
+        if searched and search_query.strip():
+            st.session_state.search_query = search_query.strip()
+            st.session_state.show_results = True
+            st.rerun()
+    
+    st.markdown("*...or answer a few questions and let our AI find your match:*")
+    
     with st.form("car_questionnaire"):
         col1, col2 = st.columns(2)
         
@@ -170,44 +205,72 @@ def show_questionnaire():
                 'brand': brand,
                 'important_features': important_features
             }
+            st.session_state.search_query = None
             st.session_state.show_results = True
             st.rerun()
 
-def show_results(df, responses, ai_assistant=None):
-    """Display the unified AI-powered recommendation results"""
-    
-    st.title("🎯 Your Personalized Used Car Matches")
+def show_results(df, responses, ai_assistant=None, search_query=None):
+    """Display the unified AI-powered recommendation results, or free-text search results"""
     
-    # Show user profile summary
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.info(f"**Age:** {responses['age']}")
-    with col2:
-        st.info(f"**Family Size:** {responses['family_size']}")
-    with col3:
-        st.info(f"**Budget:** ${responses['budget']:,}")
+    if search_query:
+        st.title("🔎 Your Used Car Search Results")
+        st.info(f"**Search:** {search_query}")
+    else:
+        st.title("🎯 Your Personalized Used Car Matches")
+        
+        # Show user profile summary
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.info(f"**Age:** {responses['age']}")
+        with col2:
+            st.info(f"**Family Size:** {responses['family_size']}")
+        with col3:
+            st.info(f"**Budget:** ${responses['budget']:,}")
+        
+        if not ai_assistant:
+            st.error("🤖 AI Assistant not available. Please configure your OpenAI API key.")
+            return
     
-    if not ai_assistant:
-        st.error("🤖 AI Assistant not available. Please configure your OpenAI API key.")
-        return
+    # Results are cached per session as catalog row IDs, so reruns from card
+    # buttons and chat turns don't repeat the search or the AI calls
+    memory = get_session_memory()
+    session_id = get_session_id()
+    results_key = f"search:{search_query}" if search_query else json.dumps(responses, sort_keys=True)
     
-    # Get AI-powered recommendations (single unified system)
-    with st.spinner("🤖 AI is analyzing all cars and creating your personalized recommendations..."):
+    # Get AI-powered recommendations (single unified system), or search the
+    # whole catalog locally when the user typed a free-text query
+    spinner_text = "🔎 Searching all listings..." if search_query else "🤖 AI is analyzing all cars and creating your personalized recommendations..."
+    with st.spinner(spinner_text):
         try:
-            recommendations, ai_summary = get_ai_recommendations(df, responses, ai_assistant)
+            cached = memory.load_results(session_id, results_key, df)
+            if cached is not None:
+                recommendations, ai_summary = cached
+            else:
+                if search_query:
+                    recommendations, ai_summary = get_search_recommendations(load_search_index(df), search_query)
+                else:
+                    recommendations, ai_summary = get_ai_recommendations(df, responses, ai_assistant)
+                memory.store_results(session_id, results_key, recommendations, ai_summary, df)
             
             if len(recommendations) == 0:
-                st.warning("No cars found matching your criteria. Try adjusting your budget or preferences.")
+                if search_query:
+                    st.warning(f"No cars found: {ai_summary}. Try removing a word or loosening a limit.")
+                else:
+                    st.warning("No cars found matching your criteria. Try adjusting your budget or preferences.")
                 if st.button("🔄 Retake Questionnaire"):
                     st.session_state.show_results = False
+                    memory.clear_results(session_id)
                     st.rerun()
                 return
             
-            st.success(f"✨ AI analyzed {len(df)} used car listings and found {len(recommendations)} perfect matches for you!")
-            
-            # Show AI personal analysis summary
-            st.markdown("### 🧠 AI Personal Analysis")
-            st.info(ai_summary)
+            if search_query:
+                st.success(f"🔎 Searched all {len(df)} used car listings and found {len(recommendations)} matches: {ai_summary}")
+            else:
+                st.success(f"✨ AI analyzed {len(df)} used car listings and found {len(recommendations)} perfect matches for you!")
+                
+                # Show AI personal analysis summary
+                st.markdown("### 🧠 AI Personal Analysis")
+                st.info(ai_summary)
             
             # Show TOP PICKS (first 3)
             st.markdown("### 🌟 AI Top Picks")
@@ -342,6 +405,7 @@ def show_results(df, responses, ai_assistant=None):
     # Option to retake questionnaire
     if st.button("🔄 Start Over with New Preferences"):
         st.session_state.show_results = False
+        get_session_memory().clear_results(get_session_id())
         st.rerun()
 
 def show_car_consultant():
@@ -355,12 +419,7 @@ def show_car_consultant():
     col1, col2 = st.columns([3, 1])
     with col2:
         if st.button("🗑️ Clear Chat", key="clear_consultant_chat"):
-            st.session_state.consultant_messages = [
-                {
-                    "role": "assistant", 
-                    "content": "Hello! 👋 I'm your AI car consultant. I can help you with questions about car buying, insurance, financing, maintenance, and more. What would you like to know?"
-                }
-            ]
+            get_session_memory().reset_messages(get_session_id())
             st.rerun()
     
     # Setup consultant AI
@@ -371,24 +430,20 @@ def show_car_consultant():
     
     consultant = CarConsultantAI(api_key)
     
-    # Initialize chat history for consultant
-    if "consultant_messages" not in st.session_state:
-        st.session_state.consultant_messages = [
-            {
-                "role": "assistant", 
-                "content": "Hello! 👋 I'm your AI car consultant. I can help you with questions about car buying, insurance, financing, maintenance, and more. What would you like to know?"
-            }
-        ]
+    # Chat history lives in shared session memory, capped and compacted there
+    memory = get_session_memory()
+    session_id = get_session_id()
+    chat_history = memory.get_messages(session_id)
     
     # Display chat messages from history
-    for message in st.session_state.consultant_messages:
+    for message in chat_history:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
     # Accept user input
     if prompt := st.chat_input("Ask me anything about cars..."):
         # Add user message to chat history
-        st.session_state.consultant_messages.append({"role": "user", "content": prompt})
+        memory.append_message(session_id, "user", prompt)
         
         # Display user message
         with st.chat_message("user"):
@@ -399,7 +454,7 @@ def show_car_consultant():
             # Get streaming response from consultant AI
             response_stream = consultant.get_consultant_response(
                 prompt, 
-                st.session_state.consultant_messages[:-1]  # Exclude the just-added user message
+                chat_history  # History from before the just-added user message
             )
             
             if response_stream:
@@ -407,12 +462,12 @@ def show_car_consultant():
                 response = st.write_stream(response_stream)
                 
                 # Add assistant response to chat history
-                st.session_state.consultant_messages.append({"role": "assistant", "content": response})
+                memory.append_message(session_id, "assistant", response)
             else:
                 # Fallback response if AI fails
                 fallback_response = "I apologize, but I'm having trouble connecting right now. Please try asking your question again, or feel free to contact a human car expert for assistance! 🚗"
                 st.markdown(fallback_response)
-                st.session_state.consultant_messages.append({"role": "assistant", "content": fallback_response})
+                memory.append_message(session_id, "assistant", fallback_response)
 
 def main():
     # Check if AI components are available
@@ -467,7 +522,12 @@ def main():
         show_questionnaire()
         # Return to continue with questionnaire
     else:
-        show_results(df, st.session_state.questionnaire_responses, ai_assistant)
+        show_results(
+            df,
+            st.session_state.get('questionnaire_responses'),
+            ai_assistant,
+            search_query=st.session_state.get('search_query')
+        )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from typing import List
+
+# Cohort levels from broadest to most specific. Each level's offset is shrunk
+# toward its parent so thin cohorts (most brand/model/year groups hold a single
+# listing) don't simply echo their own asking price back as "fair".
+COHORT_LEVELS = [
+    ['brand'],
+    ['brand', 'model'],
+    ['brand', 'model', 'year'],
+]
+
+# Regressors used for the depreciation adjustment, expressed in units that keep
+# the normal equations well conditioned (years since 2000, 10k miles)
+FEATURES = ['age_term', 'mileage_term']
+
+
+class MarketPriceModel:
+    """
+    Fair market price model fitted over the catalog.
+
+    log(price) is modelled as a global level plus shrunken brand, brand/model and
+    brand/model/year offsets, with year and mileage slopes estimated within
+    brand/model groups. Only additive sufficient statistics are stored, so new
+    listings can be folded in with partial_fit() without revisiting old rows.
+    """
+
+    def __init__(self, shrinkage: float = 3.0, ridge: float = 1e-6):
+        """Create an empty model; call fit() or partial_fit() before predicting"""
+        self.shrinkage = shrinkage
+        self.ridge = ridge
+        self.reset()
+
+    def reset(self):
+        """Drop all accumulated statistics"""
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_x = np.zeros(len(FEATURES))
+        self.sum_xx = np.zeros((len(FEATURES), len(FEATURES)))
+        self.sum_xy = np.zeros(len(FEATURES))
+        self.cohort_stats: List[pd.DataFrame] = [None] * len(COHORT_LEVELS)
+        self._params = None
+
+    def fit(self, cars_df: pd.DataFrame) -> 'MarketPriceModel':
+        """Fit the model from scratch on the given listings"""
+        self.reset()
+        return self.partial_fit(cars_df)
+
+    def partial_fit(self, cars_df: pd.DataFrame) -> 'MarketPriceModel':
+        """Fold additional listings into the model (incremental refit)"""
+        if len(cars_df) == 0:
+            return self
+
+        frame = self._design_frame(cars_df)
+        x = frame[FEATURES].to_numpy()
+        y = frame['log_price'].to_numpy()
+
+        self.n += len(frame)
+        self.sum_y += y.sum()
+        self.sum_x += x.sum(axis=0)
+        self.sum_xx += x.T @ x
+        self.sum_xy += x.T @ y
+
+        for level, keys in enumerate(COHORT_LEVELS):
+            batch_stats = frame.groupby(keys)[['log_price'] + FEATURES].agg('sum')
+            batch_stats['count'] = frame.groupby(keys).size()
+            if self.cohort_stats[level] is None:
+                self.cohort_stats[level] = batch_stats
+            else:
+                self.cohort_stats[level] = self.cohort_stats[level].add(batch_stats, fill_value=0)
+
+        # Solved lazily on the next predict so a burst of updates refits once
+        self._params = None
+        return self
+
+    def predict(self, cars_df: pd.DataFrame) -> pd.Series:
+        """Return the estimated fair market price for each listing"""
+        if self.n == 0:
+            raise ValueError("MarketPriceModel has not been fitted")
+
+        beta, offsets, base = self._solve()
+        frame = self._design_frame(cars_df)
+
+        log_fair = pd.Series(base + frame[FEATURES].to_numpy() @ beta, index=frame.index)
+        for keys, level_offsets in zip(COHORT_LEVELS, offsets):
+            matched = frame[keys].merge(
+                level_offsets.rename('offset').reset_index(), on=keys, how='left'
+            )['offset']
+            log_fair += matched.fillna(0).to_numpy()
+
+        return np.exp(log_fair)
+
+    def score(self, cars_df: pd.DataFrame) -> pd.Series:
+        """
+        Convert asking price vs fair price into the 0-100 pricing_score scale.
+        A listing at fair price scores 75 ("Fair Price"); every 1% below market
+        adds a point, so roughly 10% under fair value reaches "Great Deal" (85).
+        """
+        fair_price = self.predict(cars_df)
+        discount = np.log(fair_price) - np.log(cars_df['price'].astype(float))
+        return (75 + discount * 100).clip(0, 100).round().astype(int)
+
+    def _solve(self):
+        """Solve slopes and cohort offsets from the accumulated statistics"""
+        if self._params is not None:
+            return self._params
+
+        # Within brand/model estimator: remove each group's mean before
+        # regressing, so slopes capture depreciation rather than brand mix
+        model_stats = self.cohort_stats[1]
+        group_x = model_stats[FEATURES].to_numpy()
+        group_y = model_stats['log_price'].to_numpy()
+        group_n = model_stats['count'].to_numpy()[:, None]
+
+        within_xx = self.sum_xx - (group_x / group_n).T @ group_x
+        within_xy = self.sum_xy - (group_x / group_n).T @ group_y
+        beta = np.linalg.solve(within_xx + self.ridge * np.eye(len(FEATURES)), within_xy)
+
+        # Depreciation-adjusted log price sums, then hierarchical shrunken means
+        base = (self.sum_y - self.sum_x @ beta) / self.n
+        offsets = []
+        parent_level = None
+        for keys, stats in zip(COHORT_LEVELS, self.cohort_stats):
+            adjusted_sum = stats['log_price'] - stats[FEATURES].to_numpy() @ beta
+            parent = pd.Series(base, index=stats.index)
+            if parent_level is not None:
+                parent_keys, parent_mean = parent_level
+                parent = base + stats.index.to_frame(index=False)[parent_keys].merge(
+                    parent_mean.rename('offset').reset_index(), on=parent_keys, how='left'
+                )['offset'].to_numpy()
+                parent = pd.Series(parent, index=stats.index)
+
+            offset = (adjusted_sum - stats['count'] * parent) / (stats['count'] + self.shrinkage)
+            cumulative = parent - base + offset
+            offsets.append(offset)
+            parent_level = (keys, cumulative)
+
+        self._params = (beta, offsets, base)
+        return self._params
+
+    @staticmethod
+    def _design_frame(cars_df: pd.DataFrame) -> pd.DataFrame:
+        """Build the regression frame: cohort keys, scaled features and log price"""
+        frame = cars_df[['brand', 'model', 'year']].copy()
+        frame['age_term'] = cars_df['year'].astype(float) - 2000
+        frame['mileage_term'] = cars_df['mileage'].astype(float) / 10000
+        frame['log_price'] = np.log(cars_df['price'].astype(float))
+        return frame
+
+
+def add_pricing_scores(cars_df: pd.DataFrame, model: MarketPriceModel = None) -> pd.DataFrame:
+    """Return a copy of the catalog with a deterministic pricing_score column"""
+    if model is None:
+        model = MarketPriceModel().fit(cars_df)
+    scored = cars_df.copy()
+    scored['pricing_score'] = model.score(cars_df)
+    return scored
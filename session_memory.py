@@ -0,0 +1,353 @@
+import atexit
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+CONSULTANT_GREETING = "Hello! 👋 I'm your AI car consultant. I can help you with questions about car buying, insurance, financing, maintenance, and more. What would you like to know?"
+
+
+class SessionMemoryManager:
+    """
+    Process-wide store for each session's heavy state, shared by all sessions
+    of one Streamlit server.
+
+    - Recommendation results are kept as row IDs into the shared catalog plus
+      the few per-session score columns, never as copied DataFrames.
+    - Consultant chat histories are capped and compacted.
+    - Sessions idle for longer than idle_seconds are spilled to local disk and
+      transparently restored on their next rerun. Spill files are plain JSON
+      in a directory private to this process, so loading them never runs code.
+      Sweeps run on a background thread and write files outside the lock, so
+      active sessions never wait on another session's disk I/O.
+    """
+
+    def __init__(self, max_messages: int = 20, max_message_chars: int = 2000,
+                 idle_seconds: float = 900, sweep_interval: float = 60,
+                 spill_dir: str = None, spill_max_age: float = 86400):
+        """
+        Configure caps and eviction; nothing is written to disk until a sweep.
+        Without spill_dir a private directory is created with tempfile.mkdtemp()
+        on first spill and removed at exit.
+        """
+        self.max_messages = max_messages
+        self.max_message_chars = max_message_chars
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self.spill_dir = spill_dir
+        self.spill_max_age = spill_max_age
+
+        self._sessions: Dict[str, Dict] = {}
+        self._spilling: Dict[str, Dict] = {}
+        self._spilled = set()
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+        self._sweeping = False
+
+    # Session lifecycle
+
+    def touch(self, session_id: str) -> Dict:
+        """Mark a session active, restoring it from disk if it was spilled"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                # A session whose spill is still being written is taken back as is
+                session = (self._spilling.pop(session_id, None) or self._restore(session_id)
+                           or {'results': None, 'messages': [], 'trimmed': 0})
+                self._sessions[session_id] = session
+            session['last_seen'] = time.time()
+
+            if not self._sweeping and time.time() - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = time.time()
+                threading.Thread(target=self.sweep, name="session-memory-sweep", daemon=True).start()
+            return session
+
+    def sweep(self):
+        """
+        Spill idle sessions to disk and delete stale spill files. Only the
+        bookkeeping holds the lock; files are written and removed outside it.
+        """
+        with self._lock:
+            if self._sweeping:
+                return
+            self._sweeping = True
+            self._last_sweep = now = time.time()
+            idle = {}
+            for session_id, session in list(self._sessions.items()):
+                if now - session['last_seen'] >= self.idle_seconds:
+                    self._spilling[session_id] = self._sessions.pop(session_id)
+                    idle[session_id] = self._to_json(session)
+            spilled = list(self._spilled)
+
+        try:
+            written = {session_id: self._spill(session_id, data) for session_id, data in idle.items()}
+            stale = []
+            for session_id in spilled:
+                try:
+                    if now - os.path.getmtime(self._spill_path(session_id)) >= self.spill_max_age:
+                        stale.append(session_id)
+                except OSError:
+                    stale.append(session_id)
+
+            with self._lock:
+                obsolete = []
+                for session_id, ok in written.items():
+                    session = self._spilling.pop(session_id, None)
+                    if session is None:
+                        # Came back while being written; its file is out of date
+                        if ok:
+                            obsolete.append(session_id)
+                    elif ok:
+                        self._spilled.add(session_id)
+                    else:
+                        self._sessions[session_id] = session
+                # Only this manager's own spill files are ever deleted
+                stale = [session_id for session_id in stale if session_id in self._spilled]
+                self._spilled.difference_update(stale)
+
+            for session_id in obsolete + stale:
+                try:
+                    os.remove(self._spill_path(session_id))
+                except OSError:
+                    pass
+        finally:
+            with self._lock:
+                # Anything still marked in flight (the sweep failed) stays in memory
+                for session_id in idle:
+                    if session_id in self._spilling:
+                        self._sessions[session_id] = self._spilling.pop(session_id)
+                self._sweeping = False
+
+    def _private_spill_dir(self) -> Optional[str]:
+        """
+        Spill directory that only this user can write to, or None if the
+        configured one is shared or owned by someone else
+        """
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="smart_car_sessions_")
+            atexit.register(shutil.rmtree, self.spill_dir, True)
+            return self.spill_dir
+
+        os.makedirs(self.spill_dir, mode=0o700, exist_ok=True)
+        info = os.lstat(self.spill_dir)
+        if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+                or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+            return None
+        return self.spill_dir
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.json")
+
+    def _spill(self, session_id: str, data: Dict) -> bool:
+        """Write a session's JSON snapshot to disk; False if it must stay in memory"""
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', session_id):
+            return False
+        try:
+            if self._private_spill_dir() is None:
+                return False
+            with open(self._spill_path(session_id), 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            return True
+        except (OSError, TypeError, ValueError):
+            return False
+
+    def _restore(self, session_id: str) -> Optional[Dict]:
+        """Load and remove a spilled session, if there is one"""
+        if session_id not in self._spilled:
+            return None
+        self._spilled.discard(session_id)
+        path = self._spill_path(session_id)
+        try:
+            with open(path, encoding='utf-8') as f:
+                session = self._from_json(json.load(f))
+            os.remove(path)
+            return session
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _to_json(session: Dict) -> Dict:
+        """
+        Session state as JSON-safe data, arrays stored as dtype + values.
+        Copies everything, so the snapshot can be written outside the lock.
+        """
+        data = {'messages': [dict(m) for m in session['messages']], 'trimmed': session['trimmed'],
+                'results': None}
+        results = session['results']
+        if results is not None:
+            data['results'] = {
+                'key': results['key'],
+                'summary': results['summary'],
+                'row_ids': {'dtype': str(results['row_ids'].dtype), 'values': results['row_ids'].tolist()},
+                'columns': {name: {'dtype': str(values.dtype), 'values': values.tolist()}
+                            for name, values in results['columns'].items()},
+            }
+        return data
+
+    @staticmethod
+    def _from_json(data: Dict) -> Dict:
+        """Inverse of _to_json"""
+        session = {'messages': data['messages'], 'trimmed': data['trimmed'], 'results': None}
+        results = data['results']
+        if results is not None:
+            session['results'] = {
+                'key': results['key'],
+                'summary': results['summary'],
+                'row_ids': np.array(results['row_ids']['values'], dtype=results['row_ids']['dtype']),
+                'columns': {name: np.array(column['values'], dtype=column['dtype'])
+                            for name, column in results['columns'].items()},
+            }
+        return session
+
+    # Recommendation results
+
+    def store_results(self, session_id: str, key: str, recommendations: pd.DataFrame,
+                      summary: str, catalog: pd.DataFrame):
+        """
+        Keep results as catalog row IDs plus only the columns the catalog
+        doesn't already hold (ai_score, ai_explanation, ...)
+        """
+        extra_columns = [c for c in recommendations.columns if c not in catalog.columns]
+        with self._lock:
+            self.touch(session_id)['results'] = {
+                'key': key,
+                'row_ids': recommendations.index.to_numpy(),
+                'columns': {c: recommendations[c].to_numpy() for c in extra_columns},
+                'summary': summary,
+            }
+
+    def load_results(self, session_id: str, key: str, catalog: pd.DataFrame) -> Optional[Tuple[pd.DataFrame, str]]:
+        """Rebuild the results frame from the shared catalog, or None if not cached for key"""
+        with self._lock:
+            results = self.touch(session_id)['results']
+        if results is None or results['key'] != key:
+            return None
+
+        recommendations = catalog.loc[results['row_ids']].copy()
+        for column, values in results['columns'].items():
+            recommendations[column] = values
+        return recommendations, results['summary']
+
+    def clear_results(self, session_id: str):
+        """Forget a session's cached results (e.g. on "Start Over")"""
+        with self._lock:
+            self.touch(session_id)['results'] = None
+
+    # Consultant chat history
+
+    def get_messages(self, session_id: str) -> List[Dict]:
+        """Return a copy of the session's chat history, starting with the greeting"""
+        with self._lock:
+            session = self.touch(session_id)
+            if not session['messages']:
+                self.reset_messages(session_id)
+            return list(session['messages'])
+
+    def reset_messages(self, session_id: str):
+        """Clear the chat back to the greeting"""
+        with self._lock:
+            session = self.touch(session_id)
+            session['messages'] = [{"role": "assistant", "content": CONSULTANT_GREETING}]
+            session['trimmed'] = 0
+
+    def append_message(self, session_id: str, role: str, content: str):
+        """Add a chat message, truncating long content and compacting the history"""
+        if len(content) > self.max_message_chars:
+            content = content[:self.max_message_chars] + "…"
+        with self._lock:
+            session = self.touch(session_id)
+            if not session['messages']:
+                self.reset_messages(session_id)
+            session['messages'].append({"role": role, "content": content})
+            self._compact(session)
+
+    def _compact(self, session: Dict):
+        """
+        Keep the greeting and the most recent messages; older turns collapse
+        into a single note so the history never exceeds max_messages
+        """
+        messages = session['messages']
+        if len(messages) <= self.max_messages:
+            return
+
+        greeting, rest = messages[0], messages[1:]
+        if session['trimmed']:
+            rest = rest[1:]  # Previous trim note, rebuilt below
+
+        keep = self.max_messages - 2
+        session['trimmed'] += len(rest) - keep
+        note = {
+            "role": "assistant",
+            "content": f"_({session['trimmed']} earlier messages were trimmed from this conversation.)_",
+        }
+        session['messages'] = [greeting, note] + rest[-keep:]
+
+    # Metrics
+
+    @staticmethod
+    def _session_bytes(session: Dict) -> int:
+        """Approximate memory held by one session's state"""
+        total = 0
+        results = session.get('results')
+        if results:
+            total += results['row_ids'].nbytes + len(results['summary'].encode())
+            for values in results['columns'].values():
+                if values.dtype == object:
+                    total += sum(len(str(v).encode()) for v in values) + values.nbytes
+                else:
+                    total += values.nbytes
+        total += sum(len(m['content'].encode()) for m in session.get('messages', []))
+        return total
+
+    def session_metrics(self, session_id: str) -> Dict:
+        """Memory metrics for a single session"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return {
+                'in_memory': session is not None,
+                'spilled': session_id in self._spilled,
+                'bytes': self._session_bytes(session) if session else 0,
+                'messages': len(session['messages']) if session else 0,
+                'result_rows': len(session['results']['row_ids']) if session and session['results'] else 0,
+            }
+
+    def metrics(self) -> Dict:
+        """Memory metrics across all sessions of this process"""
+        with self._lock:
+            per_session = {sid: self._session_bytes(s) for sid, s in self._sessions.items()}
+            spilled = list(self._spilled)
+
+        spilled_bytes = 0
+        for session_id in spilled:
+            try:
+                spilled_bytes += os.path.getsize(self._spill_path(session_id))
+            except OSError:
+                pass
+        return {
+            'sessions_in_memory': len(per_session),
+            'sessions_spilled': len(spilled),
+            'total_bytes': sum(per_session.values()),
+            'spilled_bytes': spilled_bytes,
+            'max_session_bytes': max(per_session.values(), default=0),
+            'mean_session_bytes': float(np.mean(list(per_session.values()))) if per_session else 0.0,
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_memory() -> SessionMemoryManager:
+    """The process-wide manager shared by every session"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionMemoryManager()
+        return _manager
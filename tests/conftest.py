@@ -0,0 +1,17 @@
+import os
+
+import pandas as pd
+import pytest
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "cars_dataset.csv")
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    return pd.read_csv(DATASET)
+
+
+@pytest.fixture(scope="session")
+def index(catalog):
+    from car_search import CarSearchIndex
+    return CarSearchIndex(catalog)
@@ -0,0 +1,79 @@
+import pytest
+
+from car_search import get_search_recommendations, parse_constraints
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("under 18k", {'price': [None, 18000]}),
+    ("over $20,000", {'price': [20000, None]}),
+    ("between 10k and 20k", {'price': [10000, 20000]}),
+    ("less than 100k miles", {'mileage': [None, 100000]}),
+    ("100k miles", {'mileage': [None, 100000]}),
+    ("$18,000", {'price': [None, 18000]}),
+    ("after 2016", {'year': [2016, None]}),
+    ("2018 or newer", {'year': [2018, None]}),
+    ("2015-2018", {'year': [2015, 2018]}),
+    ("2015 to 2018", {'year': [2015, 2018]}),
+    ("2017", {'year': [2017, 2017]}),
+    ("land rover 2015", {'year': [2015, 2015]}),
+    ("RAV4 over 2015", {'year': [2015, None]}),
+    ("under $2000", {'price': [None, 2000]}),
+])
+def test_parse_constraints(query, expected):
+    constraints, _ = parse_constraints(query)
+    assert constraints == expected
+
+
+def test_comparators_do_not_match_inside_words():
+    _, text = parse_constraints("land rover 2015")
+    assert text.split() == ["land", "rover"]
+
+
+def test_parse_constraints_leaves_model_numbers_as_text():
+    constraints, text = parse_constraints("ram 1500 under 30k")
+    assert constraints == {'price': [None, 30000]}
+    assert text.split() == ["ram", "1500"]
+
+
+@pytest.mark.parametrize("query, models", [
+    ("rav 4", {"RAV4"}),
+    ("cr-v", {"CR-V", "CR-V Hybrid"}),
+    ("Toyta Camri", {"Camry", "Camry Hybrid"}),
+    ("model 3", {"Model 3"}),
+])
+def test_fuzzy_and_joined_token_matching(index, query, models):
+    results, _, _, _ = index.search(query, limit=100)
+    assert set(results['model']) == models
+
+
+def test_or_within_field_and_numeric_constraint(index):
+    results, _ = get_search_recommendations(index, "a used RAV4 or CR-V under 18k", limit=100)
+    assert set(results['model']) <= {"RAV4", "CR-V"}
+    assert len(results) > 0
+    assert (results['price'] <= 18000).all()
+
+
+def test_and_across_fields(index):
+    results, _, _, _ = index.search("red suv", limit=100)
+    assert len(results) > 0
+    assert (results['color'] == "Red").all() and (results['type'] == "SUV").all()
+
+
+def test_unmatched_words_return_nothing(index):
+    results, summary = get_search_recommendations(index, "lamborghini")
+    assert results.empty
+    assert "lamborghini" in summary
+
+
+@pytest.mark.parametrize("query", ["toyota civic", "yellow tesla", "honda f-150 under 20k"])
+def test_fields_that_match_nothing_together_return_nothing(index, query):
+    results, summary = get_search_recommendations(index, query)
+    assert results.empty
+    assert summary.startswith("No listings match")
+
+
+@pytest.mark.parametrize("query, word", [("red lamborghini", "lamborghini"), ("mercedes c300", "c300")])
+def test_partly_unmatched_query_returns_nothing(index, query, word):
+    results, summary = get_search_recommendations(index, query)
+    assert results.empty
+    assert f'"{word}"' in summary
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from pricing_model import MarketPriceModel, add_pricing_scores
+
+
+def test_partial_fit_matches_full_fit(catalog):
+    full = MarketPriceModel().fit(catalog)
+    incremental = MarketPriceModel().fit(catalog.iloc[:200]).partial_fit(catalog.iloc[200:])
+    np.testing.assert_allclose(incremental.predict(catalog), full.predict(catalog), rtol=1e-9)
+
+
+def test_score_rewards_cheaper_listings(catalog):
+    model = MarketPriceModel().fit(catalog)
+    car = catalog.iloc[[0]]
+    cheap = car.assign(price=car['price'] * 0.8)
+    pricey = car.assign(price=car['price'] * 1.2)
+    assert model.score(cheap).iloc[0] > model.score(car).iloc[0] > model.score(pricey).iloc[0]
+
+
+def test_add_pricing_scores_is_bounded(catalog):
+    scores = add_pricing_scores(catalog)['pricing_score']
+    assert len(scores) == len(catalog)
+    assert scores.between(0, 100).all()
+
+
+def test_predict_requires_fit(catalog):
+    with pytest.raises(ValueError):
+        MarketPriceModel().predict(catalog)
@@ -0,0 +1,167 @@
+import json
+import os
+import stat
+import threading
+
+import pandas as pd
+import pytest
+
+from session_memory import CONSULTANT_GREETING, SessionMemoryManager
+
+
+@pytest.fixture
+def recommendations(catalog):
+    rows = catalog.sample(5, random_state=1).copy()
+    rows['ai_score'] = [90, 85, 80, 75, 70]
+    rows['ai_explanation'] = ["Great fit", "Good value", "Reliable", "Roomy", "Efficient"]
+    return rows
+
+
+def test_chat_history_is_capped_and_compacted():
+    memory = SessionMemoryManager(max_messages=6)
+    for i in range(15):
+        memory.append_message("s1", "user" if i % 2 == 0 else "assistant", f"msg {i}")
+
+    messages = memory.get_messages("s1")
+    assert len(messages) == 6
+    assert messages[0]["content"] == CONSULTANT_GREETING
+    assert "11 earlier messages" in messages[1]["content"]
+    assert [m["content"] for m in messages[2:]] == ["msg 11", "msg 12", "msg 13", "msg 14"]
+
+
+def test_long_messages_are_truncated():
+    memory = SessionMemoryManager(max_message_chars=10)
+    memory.append_message("s1", "user", "x" * 50)
+    assert len(memory.get_messages("s1")[-1]["content"]) == 11
+
+
+def test_reset_messages_clears_trim_state():
+    memory = SessionMemoryManager(max_messages=4)
+    for i in range(10):
+        memory.append_message("s1", "user", f"msg {i}")
+    memory.reset_messages("s1")
+    memory.append_message("s1", "user", "again")
+    assert [m["content"] for m in memory.get_messages("s1")] == [CONSULTANT_GREETING, "again"]
+
+
+def test_results_are_stored_as_row_ids(catalog, recommendations):
+    memory = SessionMemoryManager()
+    memory.store_results("s1", "key", recommendations, "summary", catalog)
+
+    stored = memory.touch("s1")['results']
+    assert list(stored['row_ids']) == list(recommendations.index)
+    assert set(stored['columns']) == {'ai_score', 'ai_explanation'}
+
+    loaded, summary = memory.load_results("s1", "key", catalog)
+    pd.testing.assert_frame_equal(loaded, recommendations)
+    assert summary == "summary"
+    assert memory.load_results("s1", "other key", catalog) is None
+
+
+def test_idle_sessions_spill_to_json_and_restore(catalog, recommendations):
+    memory = SessionMemoryManager(idle_seconds=0, sweep_interval=3600)
+    memory.store_results("s1", "key", recommendations, "summary", catalog)
+    memory.append_message("s1", "user", "hello")
+    memory.sweep()
+
+    assert memory.metrics()['sessions_in_memory'] == 0
+    assert memory.session_metrics("s1")['spilled']
+    assert stat.S_IMODE(os.stat(memory.spill_dir).st_mode) == 0o700
+    with open(os.path.join(memory.spill_dir, "s1.json")) as f:
+        assert json.load(f)['messages'][-1]['content'] == "hello"
+
+    loaded, _ = memory.load_results("s1", "key", catalog)
+    pd.testing.assert_frame_equal(loaded, recommendations)
+    assert memory.get_messages("s1")[-1]["content"] == "hello"
+    assert not os.path.exists(os.path.join(memory.spill_dir, "s1.json"))
+
+
+def test_sweep_only_deletes_own_spill_files(tmp_path):
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir(mode=0o700)
+    foreign = spill_dir / "someone_else.json"
+    foreign.write_text("{}")
+    os.utime(foreign, (0, 0))
+
+    memory = SessionMemoryManager(idle_seconds=0, spill_dir=str(spill_dir), spill_max_age=0)
+    memory.append_message("s1", "user", "hello")
+    memory.sweep()
+    memory.sweep()
+
+    assert foreign.exists()
+    assert not (spill_dir / "s1.json").exists()
+
+
+def test_shared_spill_dir_is_refused(tmp_path):
+    spill_dir = tmp_path / "shared"
+    spill_dir.mkdir()
+    spill_dir.chmod(0o777)
+
+    memory = SessionMemoryManager(idle_seconds=0, spill_dir=str(spill_dir))
+    memory.append_message("s1", "user", "hello")
+    memory.sweep()
+
+    assert memory.session_metrics("s1")['in_memory']
+    assert os.listdir(spill_dir) == []
+
+
+def blocked_spill(memory, monkeypatch):
+    """Make the sweep's file writes wait until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+    write = memory._spill
+
+    def slow_spill(session_id, data):
+        started.set()
+        release.wait(5)
+        return write(session_id, data)
+
+    monkeypatch.setattr(memory, "_spill", slow_spill)
+    return started, release
+
+
+def test_sweep_writes_files_without_holding_the_lock(monkeypatch):
+    memory = SessionMemoryManager(idle_seconds=0, sweep_interval=3600)
+    memory.append_message("idle", "user", "hello")
+    started, release = blocked_spill(memory, monkeypatch)
+
+    sweeper = threading.Thread(target=memory.sweep)
+    sweeper.start()
+    assert started.wait(5)
+
+    # Another session keeps working while the spill is stuck on disk I/O
+    done = threading.Event()
+    threading.Thread(target=lambda: (memory.append_message("active", "user", "hi"), done.set())).start()
+    assert done.wait(1)
+
+    release.set()
+    sweeper.join(5)
+    assert memory.session_metrics("idle")['spilled']
+
+
+def test_session_touched_during_spill_stays_in_memory(monkeypatch):
+    memory = SessionMemoryManager(idle_seconds=0, sweep_interval=3600)
+    memory.append_message("s1", "user", "hello")
+    started, release = blocked_spill(memory, monkeypatch)
+
+    sweeper = threading.Thread(target=memory.sweep)
+    sweeper.start()
+    assert started.wait(5)
+    memory.append_message("s1", "user", "still here")
+    release.set()
+    sweeper.join(5)
+
+    metrics = memory.session_metrics("s1")
+    assert metrics['in_memory'] and not metrics['spilled']
+    assert not os.path.exists(os.path.join(memory.spill_dir, "s1.json"))
+    assert [m["content"] for m in memory.get_messages("s1")][-2:] == ["hello", "still here"]
+
+
+def test_due_sweep_runs_off_the_calling_thread(monkeypatch):
+    memory = SessionMemoryManager(sweep_interval=0)
+    sweep_threads = []
+    swept = threading.Event()
+    monkeypatch.setattr(memory, "sweep", lambda: (sweep_threads.append(threading.current_thread()), swept.set()))
+
+    memory.touch("s1")
+    assert swept.wait(5)
+    assert sweep_threads[0] is not threading.current_thread()